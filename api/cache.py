@@ -0,0 +1,184 @@
+# ==============================================================================
+# RISC-V Consensus Engine - Semantic Cache
+# ==============================================================================
+# Sits in front of the Dual-LLM pipeline. Each spec chunk is embedded and
+# compared against previously processed chunks; if one is similar enough, its
+# validated result is returned without calling Gemini or Groq at all.
+# ==============================================================================
+
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# EMBEDDINGS
+# ==============================================================================
+
+class GeminiEmbedder:
+    """Embeds text with a Gemini embedding model."""
+
+    def __init__(self, client, model: str = "gemini-embedding-001", dimensions: int = 768):
+        self.client = client
+        self.model = model
+        self.dimensions = dimensions
+
+    async def embed(self, text: str) -> List[float]:
+        """Return the embedding vector for `text`."""
+        response = await self.client.aio.models.embed_content(
+            model=self.model,
+            contents=text,
+            config={"output_dimensionality": self.dimensions},
+        )
+        return list(response.embeddings[0].values)
+
+
+# ==============================================================================
+# VECTOR STORE
+# ==============================================================================
+
+class InMemoryVectorStore:
+    """
+    Bounded, process-local store of (key, unit vector, value) entries.
+
+    Vectors live in one preallocated matrix, so a lookup is a single
+    matrix-vector product rather than a Python loop on the event loop. A
+    FAISS or chromadb backed store can be dropped in by implementing the
+    same two methods.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        # key -> (matrix row, value), in LRU order.
+        self._entries: "OrderedDict[str, Tuple[int, dict]]" = OrderedDict()
+        self._keys: List[Optional[str]] = [None] * max_entries
+        self._matrix: Optional[np.ndarray] = None
+
+    def nearest(self, vector: np.ndarray) -> Optional[Tuple[float, dict]]:
+        """Return (cosine similarity, value) of the closest stored entry."""
+        if not self._entries:
+            return None
+        rows = len(self._entries)
+        scores = self._matrix[:rows] @ vector
+        best = int(np.argmax(scores))
+
+        best_key = self._keys[best]
+        self._entries.move_to_end(best_key)
+        return float(scores[best]), self._entries[best_key][1]
+
+    def add(self, key: str, vector: np.ndarray, value: dict) -> None:
+        """Store `value`, evicting the least recently used entry when full."""
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+        if key in self._entries:
+            row = self._entries[key][0]
+        elif len(self._entries) < self.max_entries:
+            row = len(self._entries)
+        else:
+            _, (row, _) = self._entries.popitem(last=False)
+
+        self._matrix[row] = vector
+        self._keys[row] = key
+        self._entries[key] = (row, value)
+        self._entries.move_to_end(key)
+
+
+# ==============================================================================
+# THE CACHE
+# ==============================================================================
+
+def _normalize(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+class SemanticCache:
+    """
+    Semantic-similarity cache for pipeline results.
+
+    Results are kept in two tiers: an LRU keyed by the SHA-256 of the chunk
+    (exact hits skip embedding entirely), and a best-effort vector index of
+    chunk embeddings (near-duplicate hits above `threshold`). A
+    near-duplicate's result belongs to different text, so it is only
+    returned if `accept(text, result)` agrees it still holds for the new
+    chunk. Cache failures are never fatal: an embedding error only skips the
+    vector tier.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        store,
+        threshold: float = 0.95,
+        accept: Optional[Callable[[str, dict], bool]] = None,
+        max_exact_entries: int = 512,
+    ):
+        self.embedder = embedder
+        self.store = store
+        self.threshold = threshold
+        self.accept = accept
+        self.max_exact_entries = max_exact_entries
+        self._exact: "OrderedDict[str, dict]" = OrderedDict()
+        # Embeddings computed during get_similar(), reused by the following put().
+        self._recent: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    async def _embed(self, key: str, text: str) -> np.ndarray:
+        vector = self._recent.pop(key, None)
+        if vector is None:
+            vector = _normalize(await self.embedder.embed(text))
+        self._recent[key] = vector
+        while len(self._recent) > 64:
+            self._recent.popitem(last=False)
+        return vector
+
+    def get_exact(self, text: str) -> Optional[dict]:
+        """Return the cached result for exactly this `text`, if any."""
+        key = self._key(text)
+        result = self._exact.get(key)
+        if result is not None:
+            self._exact.move_to_end(key)
+        return result
+
+    async def get_similar(self, text: str) -> Optional[dict]:
+        """Return the cached result of a near-identical chunk, if acceptable."""
+        key = self._key(text)
+        try:
+            vector = await self._embed(key, text)
+        except Exception as e:
+            log.warning("Semantic cache lookup skipped: %s", e)
+            return None
+
+        match = self.store.nearest(vector)
+        if match is None or match[0] < self.threshold:
+            return None
+        if self.accept is not None and not self.accept(text, match[1]):
+            return None
+        return match[1]
+
+    async def put(self, text: str, result: dict) -> None:
+        """Remember the validated `result` for `text`."""
+        key = self._key(text)
+        self._exact[key] = result
+        self._exact.move_to_end(key)
+        while len(self._exact) > self.max_exact_entries:
+            self._exact.popitem(last=False)
+
+        try:
+            vector = await self._embed(key, text)
+        except Exception as e:
+            log.warning("Semantic cache store skipped: %s", e)
+            return
+
+        self._recent.pop(key, None)
+        self.store.add(key, vector, result)
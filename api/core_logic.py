@@ -8,47 +8,176 @@
 # ==============================================================================
 
 import os
-import json
 import re
-from typing import List, Optional
+import logging
+import asyncio
+import hashlib
+import httpx
+import ijson
+import msgspec
+from typing import Annotated, Any, Dict, List, Optional, Union
+import groq
+from aiolimiter import AsyncLimiter
 from google import genai
+from google.genai import errors as genai_errors
 from google.genai import types
 from groq import AsyncGroq
-from pydantic import BaseModel, Field
-from .prompts import EXTRACTION_PROMPT, VERIFICATION_PROMPT
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+# Optional: speeds up chunking of book-length documents. Not needed on the
+# serverless deployment, where inputs are far below NUMBA_CHUNK_THRESHOLD.
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = None
+    njit = None
+
+# Optional: matches all excerpts of a batch against the source in one scan.
+# Only used for sources of at least HYPERSCAN_MIN_CHARS characters.
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+from .cache import GeminiEmbedder, InMemoryVectorStore, SemanticCache
+from .prompts import (
+    EXTRACTION_PROMPT,
+    VERIFICATION_PROMPT,
+    SPECULATIVE_VERIFICATION_PROMPT,
+)
+
+log = logging.getLogger(__name__)
+
+
+# Largest chunk (in characters) sent to the speculative Llama pass. Beyond this
+# the text no longer fits Llama's context next to the prompt, so Phase 2 runs
+# only after Gemini has finished.
+SPECULATIVE_MAX_CHARS = 12000
+
+GEMINI_MODEL = "gemini-flash-latest"
+GROQ_MODEL = "llama-3.1-8b-instant"
+# Embedding model behind the semantic cache.
+EMBEDDING_MODEL = os.environ.get("GEMINI_EMBEDDING_MODEL", "gemini-embedding-001")
+# By default the similarity lookup finishes before any LLM call, so a
+# near-duplicate hit costs nothing. CACHE_OVERLAP_LOOKUP=1 starts the pipeline
+# alongside the lookup instead, trading the provider calls already sent on a
+# hit for one less embedding round-trip of latency on a miss.
+CACHE_OVERLAP_LOOKUP = os.environ.get("CACHE_OVERLAP_LOOKUP") == "1"
+
+# Client-side rate limits (requests per minute) per provider, so concurrent
+# fan-out stays under the account quota instead of collecting 429s.
+GEMINI_REQUESTS_PER_MINUTE = int(os.environ.get("GEMINI_QPM", "500"))
+GROQ_REQUESTS_PER_MINUTE = int(os.environ.get("GROQ_QPM", "500"))
+
+# Output-token budget for Groq calls. Decode time grows with output length, so
+# each verification call reserves roughly one verdict's worth per proposal:
+# the echoed name and excerpt (estimated at CHARS_PER_TOKEN) plus the other
+# fields and notes. Batches that would need more than MAX_VERIFY_TOKENS are
+# split, and so are batches whose reply is truncated anyway.
+CHARS_PER_TOKEN = 4
+VERIFY_TOKENS_PER_ITEM = 128
+VERIFY_TOKENS_BASE = 256
+MAX_VERIFY_TOKENS = 4096
+# The speculative pass quotes its own excerpts from the whole chunk.
+SPECULATIVE_MAX_TOKENS = 8192
+
+# Sources shorter than this are grounded with plain substring search: for
+# typical chunks, compiling a Hyperscan database per batch costs more than
+# the scans it replaces.
+HYPERSCAN_MIN_CHARS = 1_000_000
+
+# Proposals are verified in mini-batches of this size, concurrently and while
+# Gemini is still streaming, so Phase 2 starts before Phase 1 has finished.
+VERIFY_BATCH_SIZE = 16
+
+# Markdown code fences (optionally tagged `json`) around an LLM JSON reply.
+_FENCE_RE = re.compile(rb"\A\s*```(?:json)?|```\s*\Z")
+
+# Gemini Batch Mode polling. Batch jobs are billed at a discount but may take
+# minutes to hours, so they are only used for offline (non-interactive) ingest.
+BATCH_POLL_SECONDS = 30
+BATCH_VERIFY_CONCURRENCY = 8
+BATCH_TERMINAL_STATES = {
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+}
 
 
 # ==============================================================================
 # DATA MODELS
 # ==============================================================================
 
-class Parameter(BaseModel):
+class Parameter(msgspec.Struct, omit_defaults=True):
     """A single extracted architectural parameter."""
-    name: str = Field(..., description="Parameter name or description")
-    excerpt: str = Field(..., description="Exact excerpt from source text")
-    category: str = Field(..., description="Named|Unnamed|ConfigDependent|Numeric")
-    confidence: float = Field(default=0.0, ge=0.0, le=1.0)
-    is_valid: bool = Field(default=True)
+    name: str                       # Parameter name or description
+    excerpt: str                    # Exact excerpt from source text
+    category: str                   # Named|Unnamed|ConfigDependent|Numeric
+    confidence: Annotated[float, msgspec.Meta(ge=0.0, le=1.0)] = 0.0
+    is_valid: bool = True
     reasoning: Optional[str] = None
     verification_notes: Optional[str] = None
 
 
-class ExtractionResult(BaseModel):
+# Gemini's extraction output: normally a JSON array of proposed parameters,
+# occasionally wrapped as {"parameters": [...]} or a single bare object. Items
+# are validated one by one, so a malformed proposal doesn't sink the reply.
+ProposedParamList = Union[List[Any], Dict[str, Any]]
+
+
+class VerifiedItem(msgspec.Struct):
+    """A single verdict returned by the verifier (Llama 3)."""
+    name: Optional[str] = "Unknown"
+    excerpt: Optional[str] = ""
+    category: Optional[str] = None
+    original_category: Optional[str] = None
+    is_valid: Optional[bool] = True
+    confidence: Optional[float] = 0.8
+    rejection_reason: Optional[str] = None
+    verification_notes: Optional[str] = None
+    
+    def __post_init__(self):
+        # Llama emits explicit nulls for fields it has nothing to say about;
+        # treat them as missing so the defaults apply.
+        for field in msgspec.structs.fields(self):
+            if getattr(self, field.name) is None:
+                setattr(self, field.name, field.default)
+
+
+class VerifiedPayload(msgspec.Struct):
+    """Llama's verification output: verdicts plus an optional summary."""
+    results: Optional[List[VerifiedItem]] = []
+    # Recomputed by the engine; accepted in any shape and otherwise ignored.
+    summary: Any = None
+    
+    def __post_init__(self):
+        if self.results is None:
+            self.results = []
+
+
+# Llama normally returns the documented object, but a bare array of verdicts
+# is accepted too.
+VerifiedReply = Union[VerifiedPayload, List[VerifiedItem]]
+
+
+class ExtractionResult(msgspec.Struct):
     """Result from the extraction phase (Gemini)."""
     success: bool
-    parameters: List[dict]
+    parameters: List[Parameter]
     error: Optional[str] = None
 
 
-class VerificationResult(BaseModel):
+class VerificationResult(msgspec.Struct):
     """Result from the verification phase (Llama 3)."""
     success: bool
-    results: List[dict]
+    results: List[VerifiedItem]
     summary: Optional[dict] = None
     error: Optional[str] = None
 
 
-class ConsensusResult(BaseModel):
+class ConsensusResult(msgspec.Struct, kw_only=True):
     """Final output from the Consensus Engine."""
     strategy: str = "Dual-LLM Consensus"
     model_a: str = "Gemini 1.5 Flash"
@@ -61,6 +190,124 @@ class ConsensusResult(BaseModel):
     verification_summary: Optional[dict] = None
 
 
+# ==============================================================================
+# RETRIES
+# ==============================================================================
+
+def _is_transient(exc: BaseException) -> bool:
+    """Rate limits, server errors, timeouts and dropped connections."""
+    if isinstance(exc, genai_errors.APIError):
+        return exc.code == 429 or (exc.code or 0) >= 500
+    return isinstance(exc, (
+        groq.RateLimitError,
+        groq.InternalServerError,
+        groq.APIConnectionError,
+        httpx.TransportError,
+        TimeoutError,
+    ))
+
+
+# Retry a provider call with jittered exponential backoff. The last error is
+# re-raised unchanged so callers report the real cause.
+_provider_retry = retry(
+    wait=wait_random_exponential(min=0.5, max=8),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception(_is_transient),
+    reraise=True,
+)
+
+
+async def _prepend(first, rest):
+    """Async-iterate `first` (if not None) followed by the items of `rest`."""
+    if first is not None:
+        yield first
+    async for item in rest:
+        yield item
+
+
+# ==============================================================================
+# PROPOSAL SCREENING
+# ==============================================================================
+
+class _ProposalScreen:
+    """
+    Cheap pre-verification filter for one chunk's proposals.
+    
+    Gemini often repeats a parameter (e.g. misa, XLEN) across paragraphs and
+    sometimes quotes text that is not in the source. Duplicates are dropped
+    and ungrounded excerpts are rejected before they cost verifier tokens.
+    """
+    
+    def __init__(self, text_chunk: str):
+        # Compare with whitespace collapsed so line-wrapped quotes still match.
+        self._source = " ".join(text_chunk.split())
+        self._source_lower = None
+        self._source_bytes = None
+        self._seen = set()
+        self.unique: List[Parameter] = []
+    
+    def admit(self, param: Parameter) -> bool:
+        """Record `param`; False if an equivalent proposal was already seen."""
+        key = (param.name.strip().lower(), param.excerpt[:64])
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        self.unique.append(param)
+        return True
+    
+    def grounded(self, excerpts: List[str]) -> List[bool]:
+        """
+        Whether each excerpt appears in the source (case-insensitive).
+        
+        For sources of HYPERSCAN_MIN_CHARS or more, with Hyperscan installed,
+        all excerpts are compiled into one multi-literal database and the
+        source is scanned once, instead of one substring search per excerpt.
+        """
+        excerpts = [" ".join(e.split()) for e in excerpts]
+        if hyperscan is not None and len(self._source) >= HYPERSCAN_MIN_CHARS and any(excerpts):
+            try:
+                return self._grounded_hyperscan(excerpts)
+            except hyperscan.error:
+                pass
+        
+        if self._source_lower is None:
+            self._source_lower = self._source.lower()
+        return [bool(e) and e.lower() in self._source_lower for e in excerpts]
+    
+    def _grounded_hyperscan(self, excerpts: List[str]) -> List[bool]:
+        ids = [i for i, e in enumerate(excerpts) if e]
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[re.escape(excerpts[i]).encode() for i in ids],
+            ids=ids,
+            elements=len(ids),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(ids),
+        )
+        
+        found = set()
+        
+        def on_match(match_id, start, end, flags, context):
+            found.add(match_id)
+        
+        if self._source_bytes is None:
+            self._source_bytes = self._source.encode()
+        db.scan(self._source_bytes, match_event_handler=on_match)
+        return [i in found for i in range(len(excerpts))]
+    
+    @staticmethod
+    def reject(param: Parameter) -> VerifiedItem:
+        """Verdict for a proposal whose excerpt is not in the source."""
+        return VerifiedItem(
+            name=param.name,
+            excerpt=param.excerpt,
+            category=param.category,
+            original_category=param.category,
+            is_valid=False,
+            confidence=0.0,
+            rejection_reason="Excerpt not found in source text",
+        )
+
+
 # ==============================================================================
 # THE CONSENSUS ENGINE
 # ==============================================================================
@@ -78,7 +325,12 @@ class ConsensusEngine:
     """
     
     def __init__(self):
-        """Initialize API clients from environment variables."""
+        """
+        Initialize API clients from environment variables.
+        
+        The engine is meant to be long-lived (one per process) so the clients'
+        connection pools, keep-alive sockets and TLS sessions are reused.
+        """
         gemini_key = os.environ.get("GEMINI_KEY")
         groq_key = os.environ.get("GROQ_KEY")
         
@@ -88,75 +340,371 @@ class ConsensusEngine:
             raise ValueError("GROQ_KEY environment variable not set")
         
         self.gemini = genai.Client(api_key=gemini_key)
-        self.groq = AsyncGroq(api_key=groq_key)
-    
-    def _clean_json_response(self, text: str) -> str:
-        """Clean markdown code blocks from JSON response."""
-        # Remove markdown code blocks if present
-        text = text.strip()
-        if text.startswith("```json"):
-            text = text[7:]
-        elif text.startswith("```"):
-            text = text[3:]
-        if text.endswith("```"):
-            text = text[:-3]
-        return text.strip()
-    
-    async def _extract_with_gemini(self, text_chunk: str) -> ExtractionResult:
+        # HTTP/2 lets concurrent verification calls multiplex over a few
+        # connections instead of opening one per in-flight request.
+        # Retries are handled by _provider_retry, not the SDK.
+        self.groq = AsyncGroq(
+            api_key=groq_key,
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+                http2=True,
+            ),
+        )
+    
+        # Results for previously seen (or near-identical) chunks are served
+        # without any LLM round-trip.
+        self._gemini_limiter = AsyncLimiter(GEMINI_REQUESTS_PER_MINUTE, 60)
+        self._groq_limiter = AsyncLimiter(GROQ_REQUESTS_PER_MINUTE, 60)
+        
+        self.cache = SemanticCache(
+            GeminiEmbedder(self.gemini, model=EMBEDDING_MODEL),
+            InMemoryVectorStore(),
+            accept=self._reusable,
+        )
+        # Pipelines currently running, keyed by chunk hash, so concurrent
+        # callers with the same chunk share a single set of API calls.
+        self._inflight: Dict[str, asyncio.Task] = {}
+    
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections held by the API clients."""
+        await self.groq.close()
+    
+    def _clean_json_response(self, text: Union[bytes, str]) -> bytes:
         """
-        Phase 1: PROPOSE
-        Use Gemini 1.5 Flash for high-recall extraction.
-        Gemini's 1M token context window handles large spec chunks.
+        Clean markdown code blocks from JSON response.
+        
+        Returns UTF-8 bytes so the result feeds msgspec.json.decode without
+        another encode.
         """
+        if isinstance(text, str):
+            text = text.encode()
+        return _FENCE_RE.sub(b"", text).strip()
+    
+    def _gemini_contents(self, text_chunk: str) -> types.Content:
+        """Build the extraction request contents for a spec chunk."""
+        return types.Content(
+            role="user",
+            parts=[
+                types.Part(text=EXTRACTION_PROMPT),
+                types.Part(text=f"\n\n--- SPECIFICATION TEXT ---\n\n{text_chunk}")
+            ]
+        )
+    
+    def _gemini_config(self) -> types.GenerateContentConfig:
+        """Generation config shared by interactive and batch extraction."""
+        return types.GenerateContentConfig(
+            response_mime_type="application/json",
+            temperature=0.2,
+        )
+    
+    def _to_parameter(self, obj: Any) -> Optional[Parameter]:
+        """Validate one proposed parameter; None (and a log line) if malformed."""
         try:
-            response = self.gemini.models.generate_content(
-                model="gemini-flash-latest",
-                contents=types.Content(
-                    parts=[
-                        types.Part(text=EXTRACTION_PROMPT),
-                        types.Part(text=f"\n\n--- SPECIFICATION TEXT ---\n\n{text_chunk}")
-                    ]
-                ),
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    temperature=0.2,  
-                )
+            return msgspec.convert(obj, Parameter)
+        except msgspec.ValidationError as e:
+            log.warning("Dropping malformed Gemini proposal: %s", e)
+            return None
+    
+    def _parse_gemini_response(self, response_text: Union[bytes, str]) -> ExtractionResult:
+        """Normalize a Gemini JSON response into an ExtractionResult."""
+        try:
+            proposed_params = msgspec.json.decode(
+                self._clean_json_response(response_text), type=ProposedParamList
             )
-            
-            # Parse the response
-            response_text = self._clean_json_response(response.text)
-            proposed_params = json.loads(response_text)
-            
-            # Ensure it's a list
             if isinstance(proposed_params, dict):
                 proposed_params = proposed_params.get("parameters", [proposed_params])
+                if not isinstance(proposed_params, list):
+                    proposed_params = [proposed_params]
             
-            return ExtractionResult(success=True, parameters=proposed_params)
+            parameters = [self._to_parameter(obj) for obj in proposed_params]
+            return ExtractionResult(
+                success=True, parameters=[p for p in parameters if p is not None]
+            )
             
-        except json.JSONDecodeError as e:
+        except msgspec.DecodeError as e:
             return ExtractionResult(
                 success=False, 
                 parameters=[], 
                 error=f"Gemini JSON parse error: {str(e)}"
             )
+    
+    @_provider_retry
+    async def _open_gemini_stream(self, text_chunk: str) -> tuple:
+        """
+        Start a streamed extraction and wait for its first response.
+        
+        The request is only sent once the stream is iterated, so the first
+        response is pulled here to make connection and quota errors retryable.
+        Failures after streaming has started are not retried.
+        
+        Returns:
+            (first response or None, the remaining stream)
+        """
+        async with self._gemini_limiter:
+            stream = await self.gemini.aio.models.generate_content_stream(
+                model=GEMINI_MODEL,
+                contents=self._gemini_contents(text_chunk),
+                config=self._gemini_config()
+            )
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                first = None
+        return first, stream
+    
+    @_provider_retry
+    async def _groq_completion(self, **kwargs):
+        """Rate-limited, retried Groq chat completion."""
+        async with self._groq_limiter:
+            return await self.groq.chat.completions.create(**kwargs)
+    
+    async def _extract_with_gemini(
+        self,
+        text_chunk: str,
+        queue: Optional[asyncio.Queue] = None
+    ) -> ExtractionResult:
+        """
+        Phase 1: PROPOSE
+        Use Gemini 1.5 Flash for high-recall extraction.
+        Gemini's 1M token context window handles large spec chunks.
+        
+        The response is streamed and parsed incrementally with ijson; each
+        parameter is put on `queue` as soon as it is complete, followed by a
+        None sentinel, so verification can start before Gemini finishes.
+        """
+        parameters = []
+        try:
+            first, stream = await self._open_gemini_stream(text_chunk)
+            
+            events = ijson.sendable_list()
+            parser = ijson.items_coro(events, "item", use_float=True)
+            head = b""
+            buffered = None
+            
+            async for response in _prepend(first, stream):
+                data = (response.text or "").encode()
+                
+                if buffered is not None:
+                    buffered.append(data)
+                    continue
+                if head is not None:
+                    # Only a bare JSON array can be streamed item by item;
+                    # anything else (wrapper object, code fences) is buffered
+                    # and parsed in one go at the end.
+                    head += data
+                    if not head.strip():
+                        continue
+                    data, head = head, None
+                    if not data.lstrip().startswith(b"["):
+                        buffered = [data]
+                        continue
+                
+                parser.send(data)
+                for obj in events:
+                    param = self._to_parameter(obj)
+                    if param is None:
+                        continue
+                    parameters.append(param)
+                    if queue is not None:
+                        queue.put_nowait(param)
+                del events[:]
+            
+            if buffered is not None:
+                result = self._parse_gemini_response(b"".join(buffered))
+                if queue is not None:
+                    for param in result.parameters:
+                        queue.put_nowait(param)
+                return result
+            
+            parser.close()
+            return ExtractionResult(success=True, parameters=parameters)
+            
+        except (ijson.JSONError, msgspec.DecodeError) as e:
+            return ExtractionResult(
+                success=False,
+                parameters=[],
+                error=f"Gemini JSON parse error: {str(e)}"
+            )
         except Exception as e:
             return ExtractionResult(
                 success=False, 
                 parameters=[], 
                 error=f"Gemini extraction error: {str(e)}"
             )
+        finally:
+            if queue is not None:
+                queue.put_nowait(None)
     
-    async def _verify_with_llama(self, text_chunk: str, proposed_params: List[dict]) -> VerificationResult:
+    async def _extract_with_gemini_batch(self, chunks: List[str]) -> List[ExtractionResult]:
+        """
+        Phase 1 (offline): PROPOSE via Gemini Batch Mode
+        Submit every chunk as one inline batch job and poll until it finishes.
+        Raises if the job cannot be created or does not succeed, so callers can
+        fall back to the interactive path.
+        """
+        job = await self.gemini.aio.batches.create(
+            model=GEMINI_MODEL,
+            src=[
+                types.InlinedRequest(
+                    contents=[self._gemini_contents(chunk)],
+                    config=self._gemini_config(),
+                )
+                for chunk in chunks
+            ],
+            config=types.CreateBatchJobConfig(display_name="consensus-engine-extract"),
+        )
+        
+        while job.state is None or job.state.name not in BATCH_TERMINAL_STATES:
+            await asyncio.sleep(BATCH_POLL_SECONDS)
+            job = await self.gemini.aio.batches.get(name=job.name)
+        
+        if job.state.name != "JOB_STATE_SUCCEEDED":
+            raise RuntimeError(f"Gemini batch job {job.name} ended in {job.state.name}")
+        
+        results = [
+            ExtractionResult(success=False, parameters=[], error="Missing batch response")
+            for _ in chunks
+        ]
+        responses = job.dest.inlined_responses if job.dest else None
+        # Inlined responses come back in request order.
+        for i, inlined in enumerate(responses or []):
+            if inlined.error is not None or inlined.response is None:
+                results[i] = ExtractionResult(
+                    success=False,
+                    parameters=[],
+                    error=f"Gemini batch error: {inlined.error}"
+                )
+            elif not inlined.response.text:
+                # Blocked or empty candidate: fail this chunk, keep the rest.
+                results[i] = ExtractionResult(
+                    success=False,
+                    parameters=[],
+                    error="Gemini batch returned no text"
+                )
+            else:
+                results[i] = self._parse_gemini_response(inlined.response.text)
+        
+        return results
+    
+    def _parse_llama_response(self, response_text: str) -> VerificationResult:
+        """
+        Normalize a Llama JSON response into a VerificationResult.
+        
+        Decoding is lax (strict=False), so stringly-typed values such as
+        "is_valid": "false" or "confidence": "0.7" are coerced.
+        """
+        verified_data = msgspec.json.decode(response_text, type=VerifiedReply, strict=False)
+        if isinstance(verified_data, list):
+            return VerificationResult(success=True, results=verified_data)
+        
+        return VerificationResult(
+            success=True,
+            results=verified_data.results,
+            summary=verified_data.summary if isinstance(verified_data.summary, dict) else None
+        )
+    
+    async def _propose_with_llama(self, text_chunk: str) -> VerificationResult:
+        """
+        Phase 2 (speculative): FIND & VERIFY
+        Ask Llama 3 to pick out the parameters it can verify directly from the
+        source, without waiting for Gemini's proposals. Runs concurrently with
+        Phase 1; parameters both models agree on skip the verification call.
+        """
+        try:
+            response = await self._groq_completion(
+                messages=[
+                    {
+                        "role": "system",
+                        "content": SPECULATIVE_VERIFICATION_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": f"""
+--- SOURCE TEXT ---
+{text_chunk}
+
+Please list every parameter you can verify according to the rules.
+"""
+                    }
+                ],
+                model=GROQ_MODEL,
+                max_tokens=min(
+                    SPECULATIVE_MAX_TOKENS,
+                    VERIFY_TOKENS_BASE + 3 * len(text_chunk) // CHARS_PER_TOKEN
+                ),
+                response_format={"type": "json_object"},
+                temperature=0.1,
+            )
+            
+            return self._parse_llama_response(response.choices[0].message.content)
+            
+        except msgspec.DecodeError as e:
+            return VerificationResult(
+                success=False,
+                results=[],
+                error=f"Llama JSON parse error: {str(e)}"
+            )
+        except Exception as e:
+            return VerificationResult(
+                success=False,
+                results=[],
+                error=f"Llama speculative pass error: {str(e)}"
+            )
+    
+    async def _verify_with_llama(self, text_chunk: str, proposed_params: List[Parameter]) -> VerificationResult:
         """
         Phase 2: VERIFY
         Use Llama 3 70B via Groq for strict verification.
         Llama provides a different model bias, reducing systematic errors.
         Groq's inference speed makes this practical for production.
+        
+        Proposals are split into batches of VERIFY_BATCH_SIZE and verified
+        concurrently; shorter prompts decode faster than one long call.
+        """
+        batches = [
+            proposed_params[i:i + VERIFY_BATCH_SIZE]
+            for i in range(0, len(proposed_params), VERIFY_BATCH_SIZE)
+        ]
+        if len(batches) == 1:
+            return await self._verify_one_batch(text_chunk, batches[0])
+        
+        responses = await asyncio.gather(
+            *[self._verify_one_batch(text_chunk, batch) for batch in batches]
+        )
+        
+        failed = next((r for r in responses if not r.success), None)
+        if failed is not None:
+            return failed
+        
+        results = [item for r in responses for item in r.results]
+        return VerificationResult(success=True, results=results, summary=self._summarize(results))
+    
+    async def _verify_one_batch(
+        self,
+        text_chunk: str,
+        proposed_params: List[Parameter]
+    ) -> VerificationResult:
         """
+        Verify a single batch of proposals with one Groq call.
+        
+        A batch whose verdicts would not fit the output budget, or whose reply
+        comes back truncated, is split in half and each half verified on its
+        own.
+        """
+        max_tokens = self._verify_token_budget(proposed_params)
+        if max_tokens > MAX_VERIFY_TOKENS and len(proposed_params) > 1:
+            return await self._verify_split(text_chunk, proposed_params)
+        
         try:
-            verification_payload = json.dumps(proposed_params, indent=2)
+            # Compact JSON with only the fields the verifier checks: indentation
+            # and the proposer's reasoning are pure prompt-token overhead.
+            verification_payload = msgspec.json.encode([
+                {"name": p.name, "excerpt": p.excerpt, "category": p.category}
+                for p in proposed_params
+            ]).decode()
             
-            response = await self.groq.chat.completions.create(
+            response = await self._groq_completion(
                 messages=[
                     {
                         "role": "system", 
@@ -175,24 +723,21 @@ Please verify each parameter according to the rules.
 """
                     }
                 ],
-                model="llama-3.1-8b-instant",
+                model=GROQ_MODEL,
+                max_tokens=min(MAX_VERIFY_TOKENS, max_tokens),
                 response_format={"type": "json_object"},
                 temperature=0.1,
             )
             
-            response_text = response.choices[0].message.content
-            verified_data = json.loads(response_text)
-            
-            # Handle different response structures
-            results = verified_data.get("results", [])
-            if not results and isinstance(verified_data, list):
-                results = verified_data
+            choice = response.choices[0]
+            if choice.finish_reason == "length" and len(proposed_params) > 1:
+                log.debug("Verifier reply truncated at %d items; splitting batch",
+                          len(proposed_params))
+                return await self._verify_split(text_chunk, proposed_params)
             
-            summary = verified_data.get("summary", None)
+            return self._parse_llama_response(choice.message.content)
             
-            return VerificationResult(success=True, results=results, summary=summary)
-            
-        except json.JSONDecodeError as e:
+        except msgspec.DecodeError as e:
             return VerificationResult(
                 success=False, 
                 results=[], 
@@ -205,9 +750,101 @@ Please verify each parameter according to the rules.
                 error=f"Llama verification error: {str(e)}"
             )
     
+    def _verify_token_budget(self, proposed_params: List[Parameter]) -> int:
+        """Output tokens needed to echo a verdict for every proposal."""
+        return VERIFY_TOKENS_BASE + sum(
+            VERIFY_TOKENS_PER_ITEM + (len(p.name) + len(p.excerpt)) // CHARS_PER_TOKEN
+            for p in proposed_params
+        )
+    
+    async def _verify_split(
+        self,
+        text_chunk: str,
+        proposed_params: List[Parameter]
+    ) -> VerificationResult:
+        """Verify the two halves of a batch concurrently and combine them."""
+        half = len(proposed_params) // 2
+        responses = await asyncio.gather(
+            self._verify_one_batch(text_chunk, proposed_params[:half]),
+            self._verify_one_batch(text_chunk, proposed_params[half:]),
+        )
+        
+        failed = next((r for r in responses if not r.success), None)
+        if failed is not None:
+            return failed
+        
+        results = [item for r in responses for item in r.results]
+        return VerificationResult(success=True, results=results, summary=self._summarize(results))
+    
+    def _speculative_verdicts(
+        self,
+        speculative: VerificationResult,
+        screen: _ProposalScreen
+    ) -> Dict[str, VerifiedItem]:
+        """
+        Index Llama's speculative verdicts by normalized parameter name.
+        
+        Only valid verdicts whose own excerpt is grounded in the source are
+        kept, so an agreement is never based on text Llama made up.
+        """
+        verdicts = {}
+        if speculative.success:
+            items = [item for item in speculative.results if item.is_valid]
+            for item, ok in zip(items, screen.grounded([item.excerpt for item in items])):
+                if ok:
+                    verdicts.setdefault(item.name.strip().lower(), item)
+        return verdicts
+    
+    def _agreed_verdict(
+        self,
+        verdicts: Dict[str, VerifiedItem],
+        param: Parameter,
+        screen: _ProposalScreen
+    ) -> Optional[VerifiedItem]:
+        """
+        Return a verdict for `param` if Llama independently found it.
+        
+        A proposal is agreed when Llama found a parameter with the same name
+        and category and Gemini's excerpt is grounded too; everything else
+        still needs an explicit verification call. The verdict keeps Gemini's
+        proposal and only takes Llama's confidence and notes. Each speculative
+        verdict settles at most one proposal.
+        """
+        key = param.name.strip().lower()
+        match = verdicts.get(key)
+        if match is None or match.category != param.category:
+            return None
+        if not screen.grounded([param.excerpt])[0]:
+            return None
+        
+        del verdicts[key]
+        return VerifiedItem(
+            name=param.name,
+            excerpt=param.excerpt,
+            category=param.category,
+            original_category=param.category,
+            is_valid=True,
+            confidence=match.confidence,
+            verification_notes=match.verification_notes,
+        )
+    
+    def _summarize(self, results: List[VerifiedItem]) -> dict:
+        """Recompute the verification summary over a combined result list."""
+        validated = sum(1 for item in results if item.is_valid)
+        corrections = sum(
+            1 for item in results
+            if item.original_category and item.original_category != item.category
+        )
+        return {
+            "total_proposed": len(results),
+            "validated": validated,
+            "rejected": len(results) - validated,
+            "category_corrections": corrections,
+        }
+    
     def _merge_results(
         self, 
-        proposed: List[dict], 
+        proposed: List[Parameter], 
         verified: VerificationResult
     ) -> ConsensusResult:
         """
@@ -220,18 +857,15 @@ Please verify each parameter according to the rules.
         total_confidence = 0.0
         
         for item in verified.results:
-            is_valid = item.get("is_valid", True)
-            
-            if is_valid:
-                confidence = item.get("confidence", 0.8)
-                total_confidence += confidence
+            if item.is_valid:
+                total_confidence += item.confidence
                 
                 final_list.append({
-                    "name": item.get("name", "Unknown"),
-                    "excerpt": item.get("excerpt", ""),
-                    "category": item.get("category", item.get("original_category", "Unknown")),
-                    "confidence": confidence,
-                    "verification_notes": item.get("verification_notes", "")
+                    "name": item.name,
+                    "excerpt": item.excerpt,
+                    "category": item.category or item.original_category or "Unknown",
+                    "confidence": item.confidence,
+                    "verification_notes": item.verification_notes or ""
                 })
             else:
                 rejected_count += 1
@@ -252,8 +886,12 @@ Please verify each parameter according to the rules.
         Run the full Proposer-Verifier pipeline.
         
         Flow:
-        1. Gemini extracts all potential parameters (high recall)
-        2. Llama 3 verifies each parameter (high precision)
+        0. Join an identical in-flight run, or return a cached result if
+           this chunk (or a near-identical one) was already processed
+        1. Gemini streams all potential parameters (high recall), while
+           Llama 3 speculatively finds and verifies parameters on its own
+        2. Llama 3 verifies the proposals it did not agree on, in mini-batches
+           as they arrive (high precision)
         3. Results are merged, keeping only validated items
         
         Args:
@@ -262,12 +900,193 @@ Please verify each parameter according to the rules.
         Returns:
             Dictionary containing validated parameters and metadata
         """
+        key = hashlib.blake2b(text_chunk.encode(), digest_size=16).hexdigest()
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run_cached(text_chunk))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # Shield the shared run so one caller disconnecting doesn't cancel
+        # it for the others.
+        return await asyncio.shield(task)
+    
+    def _reusable(self, text_chunk: str, result: dict) -> bool:
+        """
+        Whether a near-duplicate chunk's cached result holds for `text_chunk`.
+        
+        Every validated excerpt must be grounded in the new text, so chunks
+        that differ in a number or a name are not served each other's results.
+        """
+        excerpts = [item.get("excerpt", "") for item in result.get("data", [])]
+        return bool(excerpts) and all(_ProposalScreen(text_chunk).grounded(excerpts))
+    
+    async def _run_cached(self, text_chunk: str) -> dict:
+        """Serve a chunk from the semantic cache, or run and cache it."""
+        cached = self.cache.get_exact(text_chunk)
+        if cached is not None:
+            log.debug("Cache hit: skipping LLM pipeline")
+            return cached
+        
+        if CACHE_OVERLAP_LOOKUP:
+            phases = asyncio.create_task(self._run_phases(text_chunk))
+            try:
+                cached = await self.cache.get_similar(text_chunk)
+            except BaseException:
+                phases.cancel()
+                raise
+            if cached is not None:
+                log.debug("Near-duplicate cache hit: cancelling LLM pipeline")
+                phases.cancel()
+                return cached
+            result = await phases
+        else:
+            cached = await self.cache.get_similar(text_chunk)
+            if cached is not None:
+                log.debug("Near-duplicate cache hit: skipping LLM pipeline")
+                return cached
+            result = await self._run_phases(text_chunk)
+        
+        # Only fully verified consensus results are worth reusing.
+        if "validated_count" in result:
+            await self.cache.put(text_chunk, result)
+        
+        return result
+    
+    async def _run_phases(self, text_chunk: str) -> dict:
+        """Run Phases 1-3 for a chunk that is not in the cache."""
         # ==============================
         # PHASE 1: EXTRACTION (Gemini)
         # ==============================
-        print("🤖 Phase 1: Gemini Extraction...")
-        extraction_result = await self._extract_with_gemini(text_chunk)
+        # When the chunk also fits Llama's context, start a speculative
+        # find-and-verify pass alongside Gemini so both round-trips overlap.
+        log.debug("Phase 1: Gemini extraction")
+        queue = asyncio.Queue()
+        extraction_task = asyncio.create_task(self._extract_with_gemini(text_chunk, queue))
+        speculative_task = None
+        if len(text_chunk) <= SPECULATIVE_MAX_CHARS:
+            speculative_task = asyncio.create_task(self._propose_with_llama(text_chunk))
         
+        # ==============================
+        # PHASE 2: VERIFICATION (Llama 3)
+        # ==============================
+        # Consume proposals as Gemini streams them. Duplicates are dropped,
+        # the rest are checked against the source and verified in mini-batches
+        # without waiting for the speculative pass. Once its verdicts are in,
+        # proposals Llama already agreed on are settled instead of verified.
+        verify_tasks = []
+        try:
+            screen = _ProposalScreen(text_chunk)
+            verdicts: Dict[str, VerifiedItem] = {}
+            speculating = speculative_task is not None
+            settled = []
+            pending = []
+            
+            def settle_agreed():
+                nonlocal speculating
+                if speculating and speculative_task.done():
+                    speculating = False
+                    verdicts.update(
+                        self._speculative_verdicts(speculative_task.result(), screen)
+                    )
+                if not verdicts:
+                    return
+                unsettled = []
+                for param in pending:
+                    match = self._agreed_verdict(verdicts, param, screen)
+                    if match is not None:
+                        settled.append(match)
+                    else:
+                        unsettled.append(param)
+                pending[:] = unsettled
+            
+            def flush():
+                batch = []
+                for param, ok in zip(pending, screen.grounded([p.excerpt for p in pending])):
+                    if ok:
+                        batch.append(param)
+                    else:
+                        settled.append(screen.reject(param))
+                pending.clear()
+                if batch:
+                    verify_tasks.append(
+                        asyncio.create_task(self._verify_with_llama(text_chunk, batch))
+                    )
+            
+            while (param := await queue.get()) is not None:
+                if not screen.admit(param):
+                    continue
+                pending.append(param)
+                settle_agreed()
+                if len(pending) >= VERIFY_BATCH_SIZE:
+                    flush()
+            settle_agreed()
+            if pending:
+                flush()
+            
+            extraction_result = await extraction_task
+            if speculative_task is not None and not speculative_task.done():
+                speculative_task.cancel()
+            if not extraction_result.success:
+                for task in verify_tasks:
+                    task.cancel()
+                verify_tasks = []
+            
+            if verify_tasks:
+                log.debug("Phase 2: Llama-3 verification in %d batches (%d already settled)",
+                          len(verify_tasks), len(settled))
+            verifications = await asyncio.gather(*verify_tasks)
+        except asyncio.CancelledError:
+            # Cancelled (e.g. on a near-duplicate cache hit): stop every
+            # provider call this run started.
+            for task in [extraction_task, speculative_task, *verify_tasks]:
+                if task is not None:
+                    task.cancel()
+            raise
+        
+        if extraction_result.success:
+            extraction_result = ExtractionResult(success=True, parameters=screen.unique)
+        return self._finalize(extraction_result, settled, verifications)
+    
+    async def _verify_and_merge(
+        self,
+        text_chunk: str,
+        extraction_result: ExtractionResult
+    ) -> dict:
+        """Run Phases 2 and 3 on the output of a completed Phase 1 extraction."""
+        if not extraction_result.success:
+            return self._finalize(extraction_result, [], [])
+        
+        screen = _ProposalScreen(text_chunk)
+        proposals = [p for p in extraction_result.parameters if screen.admit(p)]
+        settled = []
+        pending = []
+        for param, ok in zip(proposals, screen.grounded([p.excerpt for p in proposals])):
+            if ok:
+                pending.append(param)
+            else:
+                settled.append(screen.reject(param))
+        
+        verifications = []
+        if pending:
+            log.debug("Phase 2: Llama-3 verification of %d items", len(pending))
+            verifications.append(await self._verify_with_llama(text_chunk, pending))
+        
+        extraction_result = ExtractionResult(success=True, parameters=screen.unique)
+        return self._finalize(extraction_result, settled, verifications)
+    
+    def _finalize(
+        self,
+        extraction_result: ExtractionResult,
+        settled: List[VerifiedItem],
+        verifications: List[VerificationResult]
+    ) -> dict:
+        """
+        Turn Phase 1 and Phase 2 outputs into the pipeline response.
+        
+        `settled` holds verdicts reached without a verification call (Llama
+        agreement or an ungrounded excerpt).
+        """
         if not extraction_result.success:
             return {
                 "error": extraction_result.error,
@@ -286,43 +1105,122 @@ Please verify each parameter according to the rules.
                 "data": []
             }
         
-        print(f"   ✅ Found {len(proposed_params)} potential parameters")
+        log.debug("Found %d potential parameters", len(proposed_params))
         
-        # ==============================
-        # PHASE 2: VERIFICATION (Llama 3)
-        # ==============================
-        print(f"🕵️ Phase 2: Llama-3 Verification of {len(proposed_params)} items...")
-        verification_result = await self._verify_with_llama(text_chunk, proposed_params)
-        
-        if not verification_result.success:
+        failed = next((v for v in verifications if not v.success), None)
+        if failed is not None:
             # Fallback: Return Gemini results without verification
-            print(f"   ⚠️ Verification failed: {verification_result.error}")
+            log.warning("Verification failed: %s", failed.error)
             return {
-                "warning": f"Verification phase failed: {verification_result.error}",
+                "warning": f"Verification phase failed: {failed.error}",
                 "strategy": "Single-LLM (Gemini only - unverified)",
                 "model_a": "Gemini 1.5 Flash",
                 "original_count": len(proposed_params),
-                "data": proposed_params
+                "data": msgspec.to_builtins(proposed_params)
             }
         
-        print(f"   ✅ Verification complete")
+        combined = settled + [item for v in verifications for item in v.results]
+        verification_result = VerificationResult(
+            success=True,
+            results=combined,
+            summary=self._summarize(combined)
+        )
         
         # ==============================
         # PHASE 3: MERGE & REFINE
         # ==============================
-        print("📊 Phase 3: Merging results...")
+        log.debug("Phase 3: merging results")
         consensus = self._merge_results(proposed_params, verification_result)
         
-        print(f"   ✅ Final: {consensus.validated_count}/{consensus.original_count} parameters validated")
-        print(f"   📉 Rejected: {consensus.rejected_count} potential hallucinations")
+        log.debug("Final: %d/%d parameters validated, %d rejected",
+                  consensus.validated_count, consensus.original_count, consensus.rejected_count)
+        
+        return msgspec.to_builtins(consensus)
+    
+    async def run_pipeline_batch(self, chunks: List[str]) -> List[dict]:
+        """
+        Run the pipeline over many chunks using Gemini Batch Mode for Phase 1.
+        
+        Intended for offline ingestion of large documents where latency does
+        not matter: extraction is submitted as a single discounted batch job,
+        then each chunk is verified and merged. Falls back to the interactive
+        pipeline if the batch job cannot be created or does not succeed.
+        
+        Args:
+            chunks: Specification text chunks to analyze
+            
+        Returns:
+            One pipeline result dictionary per chunk, in order
+        """
+        sem = asyncio.Semaphore(BATCH_VERIFY_CONCURRENCY)
+        
+        async def interactive(chunk: str) -> dict:
+            async with sem:
+                return await self.run_pipeline(chunk)
+        
+        try:
+            extraction_results = await self._extract_with_gemini_batch(chunks)
+        except Exception as e:
+            log.warning("Batch extraction unavailable, using interactive path: %s", e)
+            return await asyncio.gather(*[interactive(chunk) for chunk in chunks])
+        
+        # Groq's batch API needs a file upload and a 24h completion window, so
+        # verification stays interactive but bounded.
+        async def finish(chunk: str, extraction_result: ExtractionResult) -> dict:
+            async with sem:
+                return await self._verify_and_merge(chunk, extraction_result)
         
-        return consensus.model_dump()
+        return await asyncio.gather(
+            *[finish(chunk, result) for chunk, result in zip(chunks, extraction_results)]
+        )
 
 
 # ==============================================================================
 # UTILITY FUNCTIONS
 # ==============================================================================
 
+# Texts longer than this are chunked with the Numba kernel when it is
+# installed; below it, JIT start-up costs more than it saves.
+NUMBA_CHUNK_THRESHOLD = 200_000
+
+_PARAGRAPH_BREAK_RE = re.compile("\n\n")
+
+if njit is not None:
+    @njit(cache=True, boundscheck=False)
+    def _pack_chunks(lengths, max_size):
+        """
+        Greedily pack paragraphs (with their separator lengths) into chunks.
+        Returns (first paragraph, end paragraph) index pairs, one per chunk.
+        """
+        n = lengths.shape[0]
+        spans = np.empty((n, 2), dtype=np.int64)
+        count = 0
+        start = 0
+        size = 0
+        for i in range(n):
+            if size + lengths[i] > max_size and i > start:
+                spans[count, 0] = start
+                spans[count, 1] = i
+                count += 1
+                start = i
+                size = 0
+            size += lengths[i]
+        spans[count, 0] = start
+        spans[count, 1] = n
+        return spans[:count + 1]
+
+
+def _chunk_text_numba(text: str, max_chunk_size: int) -> List[str]:
+    """chunk_text for very large inputs: pack paragraph offsets, slice once."""
+    breaks = np.fromiter(
+        (m.start() for m in _PARAGRAPH_BREAK_RE.finditer(text)), dtype=np.int64
+    )
+    starts = np.concatenate((np.zeros(1, dtype=np.int64), breaks + 2))
+    ends = np.concatenate((breaks, np.array([len(text)], dtype=np.int64)))
+    spans = _pack_chunks(ends - starts + 2, max_chunk_size)
+    return [text[starts[first]:ends[last - 1]].strip() for first, last in spans]
+
+
 def chunk_text(text: str, max_chunk_size: int = 8000) -> List[str]:
     """
     Split large text into manageable chunks for processing.
@@ -331,19 +1229,27 @@ def chunk_text(text: str, max_chunk_size: int = 8000) -> List[str]:
     if len(text) <= max_chunk_size:
         return [text]
     
-    chunks = []
+    if njit is not None and len(text) > NUMBA_CHUNK_THRESHOLD:
+        return _chunk_text_numba(text, max_chunk_size)
+    
     paragraphs = text.split("\n\n")
-    current_chunk = ""
+    
+    # Collect whole paragraphs and join each chunk once, instead of growing a
+    # string with += (quadratic copying on long specs).
+    chunks = []
+    buffer = []
+    size = 0
     
     for para in paragraphs:
-        if len(current_chunk) + len(para) + 2 <= max_chunk_size:
-            current_chunk += para + "\n\n"
-        else:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = para + "\n\n"
+        para_size = len(para) + 2
+        if size + para_size > max_chunk_size and buffer:
+            chunks.append("\n\n".join(buffer).strip())
+            buffer = []
+            size = 0
+        buffer.append(para)
+        size += para_size
     
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    if buffer:
+        chunks.append("\n\n".join(buffer).strip())
     
     return chunks
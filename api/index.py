@@ -5,18 +5,95 @@
 # Exposes the Dual-LLM pipeline as a REST API.
 # ==============================================================================
 
-from fastapi import FastAPI, HTTPException, Body, UploadFile, File
+from fastapi import FastAPI, HTTPException, Body, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 from typing import Optional
+import asyncio
+import logging
 import os
+import queue
+import time
+import uuid
+import orjson
 
 from .core_logic import ConsensusEngine, chunk_text
 
+log = logging.getLogger(__name__)
+
+# In-process registry of /api/extract-batch jobs, keyed by job id. Each entry
+# holds the job's task and the time it finished (None while running). Jobs
+# live only in this worker's memory, so batch endpoints need a long-lived
+# server process (see README), not per-request serverless instances.
+_batch_jobs: dict = {}
+
+# Finished jobs whose results are never fetched are dropped after this long.
+BATCH_JOB_TTL_SECONDS = int(os.environ.get("BATCH_JOB_TTL", "3600"))
+
 # ==============================================================================
 # APP CONFIGURATION
 # ==============================================================================
 
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+    
+    Endpoints return this directly with already-validated data so FastAPI
+    skips its jsonable_encoder / response-model validation pass.
+    """
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def _start_log_listener() -> tuple:
+    """
+    Route the package's loggers through a queue.
+    
+    Pipeline code logs from the event loop; handing records to a background
+    thread keeps stream writes from blocking concurrent requests.
+    """
+    records = queue.SimpleQueue()
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(records, stream)
+    
+    handler = QueueHandler(records)
+    package_log = logging.getLogger(__package__ or __name__)
+    package_log.addHandler(handler)
+    package_log.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    package_log.propagate = False
+    
+    listener.start()
+    return listener, handler
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create one ConsensusEngine per process and share it across requests."""
+    listener, handler = _start_log_listener()
+    
+    try:
+        app.state.engine = ConsensusEngine()
+        app.state.engine_error = None
+    except ValueError as e:
+        # Missing API keys: keep serving /api/health, fail extraction fast.
+        log.error("Consensus Engine not configured: %s", e)
+        app.state.engine = None
+        app.state.engine_error = str(e)
+    
+    yield
+    
+    if app.state.engine is not None:
+        await app.state.engine.aclose()
+    
+    listener.stop()
+    logging.getLogger(__package__ or __name__).removeHandler(handler)
+
+
 app = FastAPI(
     title="RISC-V Parameter Extractor",
     description="""
@@ -36,6 +113,8 @@ architectural parameters from RISC-V specification text.
 - Architecturally addresses the trust problem in automated spec extraction
     """,
     version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json"
@@ -65,6 +144,15 @@ class ExtractRequest(BaseModel):
         }
     )
 
+class ChunkedExtractRequest(ExtractRequest):
+    """Request body for the chunked extraction endpoint."""
+    max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        le=32,
+        description="Maximum number of chunks processed concurrently"
+    )
+
 class HealthResponse(BaseModel):
     """Health check response."""
     status: str
@@ -88,6 +176,30 @@ class ExtractResponse(BaseModel):
 # ENDPOINTS
 # ==============================================================================
 
+def _get_engine(request: Request) -> ConsensusEngine:
+    """
+    Return the shared engine created at startup.
+    
+    Falls back to creating it on first use when the server did not run the
+    lifespan hook (e.g. some serverless runtimes).
+    """
+    state = request.app.state
+    if not hasattr(state, "engine"):
+        try:
+            state.engine = ConsensusEngine()
+            state.engine_error = None
+        except ValueError as e:
+            state.engine = None
+            state.engine_error = str(e)
+    
+    if state.engine is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service configuration error: {state.engine_error}"
+        )
+    return state.engine
+
+
 @app.get("/api/health", response_model=HealthResponse, tags=["System"])
 def health_check():
     """
@@ -98,7 +210,7 @@ def health_check():
     gemini_configured = bool(os.environ.get("GEMINI_KEY"))
     groq_configured = bool(os.environ.get("GROQ_KEY"))
     
-    return HealthResponse(
+    health = HealthResponse(
         status="online" if (gemini_configured and groq_configured) else "degraded",
         system="Dual-LLM Consensus Engine",
         models={
@@ -115,10 +227,11 @@ def health_check():
         },
         environment="production" if os.environ.get("VERCEL") else "development"
     )
+    return FastJSONResponse(health.model_dump())
 
 
 @app.post("/api/extract", tags=["Extraction"])
-async def extract_parameters(payload: ExtractRequest):
+async def extract_parameters(payload: ExtractRequest, request: Request):
     """
     Extract and validate RISC-V architectural parameters from specification text.
     
@@ -141,17 +254,12 @@ async def extract_parameters(payload: ExtractRequest):
             detail="Text too short. Please provide at least 10 characters of specification text."
         )
     
+    engine = _get_engine(request)
+    
     try:
-        engine = ConsensusEngine()
         result = await engine.run_pipeline(payload.text)
-        return result
+        return FastJSONResponse(result)
         
-    except ValueError as e:
-        # Missing API keys
-        raise HTTPException(
-            status_code=503,
-            detail=f"Service configuration error: {str(e)}"
-        )
     except Exception as e:
         raise HTTPException(
             status_code=500, 
@@ -159,14 +267,44 @@ async def extract_parameters(payload: ExtractRequest):
         )
 
 
+def _aggregate_chunks(results: list, strategy: str) -> dict:
+    """Merge per-chunk pipeline results into a single response."""
+    all_results = []
+    total_original = 0
+    total_validated = 0
+    total_rejected = 0
+    
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            log.warning("Chunk %d/%d failed: %s", i + 1, len(results), result)
+            continue
+        
+        if "error" not in result:
+            all_results.extend(result.get("data", []))
+            total_original += result.get("original_count", 0)
+            total_validated += result.get("validated_count", 0)
+            total_rejected += result.get("rejected_count", 0)
+    
+    return {
+        "strategy": strategy,
+        "model_a": "Gemini 1.5 Flash",
+        "model_b": "Llama 3 70B",
+        "chunks_processed": len(results),
+        "original_count": total_original,
+        "validated_count": total_validated,
+        "rejected_count": total_rejected,
+        "data": all_results
+    }
+
+
 @app.post("/api/extract-chunked", tags=["Extraction"])
-async def extract_parameters_chunked(payload: ExtractRequest):
+async def extract_parameters_chunked(payload: ChunkedExtractRequest, request: Request):
     """
     Extract parameters from large specification text by processing in chunks.
     
     Use this endpoint for very large documents that might exceed model context limits.
     The text is split into manageable chunks, each processed independently, 
-    and results are merged.
+    and results are merged. Up to `max_concurrency` chunks run at once.
     """
     if len(payload.text.strip()) < 10:
         raise HTTPException(
@@ -174,42 +312,109 @@ async def extract_parameters_chunked(payload: ExtractRequest):
             detail="Text too short."
         )
     
+    engine = _get_engine(request)
+    
     try:
-        engine = ConsensusEngine()
         chunks = chunk_text(payload.text, max_chunk_size=6000)
         
-        all_results = []
-        total_original = 0
-        total_validated = 0
-        total_rejected = 0
+        sem = asyncio.Semaphore(payload.max_concurrency)
         
-        for i, chunk in enumerate(chunks):
-            print(f"Processing chunk {i+1}/{len(chunks)}...")
-            result = await engine.run_pipeline(chunk)
-            
-            if "error" not in result:
-                all_results.extend(result.get("data", []))
-                total_original += result.get("original_count", 0)
-                total_validated += result.get("validated_count", 0)
-                total_rejected += result.get("rejected_count", 0)
+        async def process_chunk(chunk: str) -> dict:
+            async with sem:
+                return await engine.run_pipeline(chunk)
         
-        return {
-            "strategy": "Dual-LLM Consensus (Chunked)",
-            "model_a": "Gemini 1.5 Flash",
-            "model_b": "Llama 3 70B",
-            "chunks_processed": len(chunks),
-            "original_count": total_original,
-            "validated_count": total_validated,
-            "rejected_count": total_rejected,
-            "data": all_results
-        }
+        log.debug("Processing %d chunks (max_concurrency=%d)",
+                  len(chunks), payload.max_concurrency)
+        results = await asyncio.gather(
+            *[process_chunk(chunk) for chunk in chunks],
+            return_exceptions=True
+        )
+        
+        return FastJSONResponse(
+            _aggregate_chunks(results, strategy="Dual-LLM Consensus (Chunked)")
+        )
         
-    except ValueError as e:
-        raise HTTPException(status_code=503, detail=f"Configuration error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
 
+def _expire_batch_jobs() -> None:
+    """Drop finished batch jobs that have outlived BATCH_JOB_TTL_SECONDS."""
+    now = time.monotonic()
+    for job_id, job in list(_batch_jobs.items()):
+        if job["finished_at"] is not None and now - job["finished_at"] > BATCH_JOB_TTL_SECONDS:
+            del _batch_jobs[job_id]
+            if not job["task"].cancelled() and job["task"].exception() is not None:
+                log.warning("Batch job %s expired unread: %s", job_id, job["task"].exception())
+
+
+@app.post("/api/extract-batch", tags=["Extraction"])
+async def submit_batch_extraction(payload: ExtractRequest, request: Request):
+    """
+    Submit a large specification for offline extraction via Gemini Batch Mode.
+    
+    Batch jobs are cheaper than interactive calls but can take minutes to hours,
+    so this endpoint returns immediately with a job id. Poll the returned URL
+    until `status` is `completed`. If batch mode is unavailable the job falls
+    back to the interactive pipeline.
+    
+    Jobs are held in the memory of the worker that accepted them, so this
+    endpoint needs a long-lived server (e.g. uvicorn); on serverless
+    deployments polls may reach another instance and return 404. Unfetched
+    results are discarded `BATCH_JOB_TTL` seconds after the job finishes.
+    """
+    if len(payload.text.strip()) < 10:
+        raise HTTPException(
+            status_code=400,
+            detail="Text too short."
+        )
+    
+    engine = _get_engine(request)
+    _expire_batch_jobs()
+    
+    chunks = chunk_text(payload.text, max_chunk_size=6000)
+    job_id = uuid.uuid4().hex
+    job = {"task": asyncio.create_task(engine.run_pipeline_batch(chunks)), "finished_at": None}
+    job["task"].add_done_callback(lambda _: job.update(finished_at=time.monotonic()))
+    _batch_jobs[job_id] = job
+    
+    return {
+        "job_id": job_id,
+        "status": "submitted",
+        "chunks": len(chunks),
+        "poll": f"/api/extract-batch/{job_id}"
+    }
+
+
+@app.get("/api/extract-batch/{job_id}", tags=["Extraction"])
+async def get_batch_extraction(job_id: str):
+    """
+    Poll a batch extraction job.
+    
+    Returns `status: running` until the job finishes, then the merged results
+    in the same shape as `/api/extract-chunked`. Completed jobs are removed
+    once their results have been returned.
+    """
+    _expire_batch_jobs()
+    
+    job = _batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired batch job: {job_id}")
+    
+    task = job["task"]
+    if not task.done():
+        return {"job_id": job_id, "status": "running"}
+    
+    del _batch_jobs[job_id]
+    
+    if task.exception() is not None:
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(task.exception())}")
+    
+    result = _aggregate_chunks(task.result(), strategy="Dual-LLM Consensus (Batch)")
+    result.update({"job_id": job_id, "status": "completed"})
+    return FastJSONResponse(result)
+
+
 @app.get("/api/models", tags=["System"])
 def list_models():
     """
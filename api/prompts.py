@@ -46,6 +46,7 @@ Return ONLY the JSON array, no other text.
 # PROMPT B: The Strict Verifier (Llama 3)
 # Purpose: Be skeptical. Eliminate hallucinations. Ensure accuracy.
 # Llama 3 70B is chosen for its strong reasoning and different training bias.
+# No summary block is requested: the engine recomputes it from the verdicts.
 VERIFICATION_PROMPT = """
 You are a meticulous QA Auditor for RISC-V specifications. Your job is to VALIDATE extracted parameters.
 
@@ -88,13 +89,7 @@ Return a JSON object with this structure:
       "rejection_reason": "only if is_valid is false",
       "verification_notes": "brief notes on your verification"
     }
-  ],
-  "summary": {
-    "total_proposed": number,
-    "validated": number,
-    "rejected": number,
-    "category_corrections": number
-  }
+  ]
 }
 
 Be STRICT but FAIR. When in doubt, verify against the exact source text provided.
@@ -109,3 +104,41 @@ Given these validated parameters, further refine their categorization:
 
 Return structured JSON with groupings.
 """
+
+# PROMPT C: The Speculative Auditor (Llama 3)
+# Purpose: Run alongside the extractor instead of after it. Llama reads the
+# source on its own and returns only parameters it can verify directly, in
+# the same shape as the verifier output, so agreements skip Phase 2.
+SPECULATIVE_VERIFICATION_PROMPT = """
+You are a meticulous QA Auditor for RISC-V specifications. Read the SOURCE TEXT and
+list the architectural parameters you can verify directly from it.
+
+An 'Architectural Parameter' is a register/field name, configuration constant,
+implementation constraint, numeric specification, or behavioral requirement.
+
+Classify each one into exactly ONE category:
+- 'Named': Has an actual formal name in the spec (capitalized, abbreviated)
+- 'Unnamed': Is a constraint without a formal name
+- 'ConfigDependent': Explicitly varies by implementation (WARL, optional, implementation-defined)
+- 'Numeric': Specifies concrete numbers
+
+RULES:
+1. The 'excerpt' MUST be copied verbatim from the source text.
+2. Only list parameters that are architecturally significant.
+3. Use the parameter's name exactly as it appears in the spec.
+
+## OUTPUT FORMAT:
+Return a JSON object with this structure:
+{
+  "results": [
+    {
+      "name": "parameter name",
+      "excerpt": "exact quote from the text",
+      "category": "Named|Unnamed|ConfigDependent|Numeric",
+      "is_valid": true,
+      "confidence": 0.0-1.0,
+      "verification_notes": "brief notes on your verification"
+    }
+  ]
+}
+"""
@@ -0,0 +1,566 @@
+# ==============================================================================
+# RISC-V Consensus Engine - Pipeline Tests
+# ==============================================================================
+# Mock-based tests for the streaming extraction and verification pipeline.
+# Gemini and Groq are replaced by in-memory fakes; no network access needed.
+# Run from the repository root with: python -m pytest
+# ==============================================================================
+
+import asyncio
+import json
+import random
+from types import SimpleNamespace
+
+import groq
+import httpx
+import pytest
+from google.genai import errors as genai_errors
+
+from api import core_logic
+from api.core_logic import (
+    ConsensusEngine,
+    Parameter,
+    VerificationResult,
+    VerifiedItem,
+    chunk_text,
+)
+
+SOURCE = (
+    "The misa CSR is a WARL read-write register reporting the ISA supported by the hart. "
+    "The MXL field encodes the native base integer ISA width. "
+    "XLEN is 32 for RV32 and 64 for RV64."
+)
+
+
+# ==============================================================================
+# FAKES
+# ==============================================================================
+
+def _param(name, excerpt, category="Named", **extra):
+    return dict(name=name, excerpt=excerpt, category=category, **extra)
+
+
+async def _stream(parts, error=None):
+    for part in parts:
+        yield SimpleNamespace(text=part)
+    if error is not None:
+        raise error
+
+
+def _split(text, size=17):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeGroq:
+    """Stands in for _groq_completion; records every verification call."""
+
+    def __init__(self, verdict=None, truncate_above=None):
+        self.calls = []
+        self.verdict = verdict or (lambda p: dict(p, is_valid=True, confidence=0.9))
+        # Replies for batches larger than this are cut off mid-JSON.
+        self.truncate_above = truncate_above
+
+    async def __call__(self, **kwargs):
+        user = kwargs["messages"][1]["content"]
+        payload = json.loads(
+            user.split("--- PROPOSED PARAMETERS ---")[1].split("Please verify")[0]
+        )
+        self.calls.append(payload)
+        content = json.dumps({"results": [self.verdict(p) for p in payload]})
+        finish_reason = "stop"
+        if self.truncate_above is not None and len(payload) > self.truncate_above:
+            content, finish_reason = content[:len(content) // 2], "length"
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)])
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setenv("GEMINI_KEY", "test")
+    monkeypatch.setenv("GROQ_KEY", "test")
+    return ConsensusEngine()
+
+
+def _fake_gemini(engine, parts, error=None):
+    async def open_stream(text_chunk):
+        stream = _stream(parts, error)
+        first = await stream.__anext__() if parts else None
+        return first, stream
+    engine._open_gemini_stream = open_stream
+
+
+def _fake_speculative(engine, items=None):
+    async def propose(text_chunk):
+        if items is None:
+            return VerificationResult(success=False, results=[])
+        return VerificationResult(success=True, results=items)
+    engine._propose_with_llama = propose
+
+
+async def _extract(engine, text):
+    queue = asyncio.Queue()
+    result = await engine._extract_with_gemini(text, queue)
+    queued = []
+    while (param := queue.get_nowait()) is not None:
+        queued.append(param)
+    return result, queued
+
+
+# ==============================================================================
+# PHASE 1: STREAMED EXTRACTION
+# ==============================================================================
+
+def test_streamed_array_is_parsed_item_by_item(engine):
+    params = [_param("misa", "The misa CSR is a WARL"), _param("XLEN", "XLEN is 32", "Numeric")]
+    _fake_gemini(engine, _split(json.dumps(params)))
+
+    result, queued = asyncio.run(_extract(engine, SOURCE))
+
+    assert result.success
+    assert [p.name for p in result.parameters] == ["misa", "XLEN"]
+    assert queued == result.parameters
+
+
+@pytest.mark.parametrize("reply", [
+    "```json\n" + json.dumps([_param("misa", "The misa CSR")]) + "\n```",
+    json.dumps({"parameters": [_param("misa", "The misa CSR")]}),
+    json.dumps(_param("misa", "The misa CSR")),
+])
+def test_buffered_replies_are_parsed_at_the_end(engine, reply):
+    _fake_gemini(engine, ["", *_split(reply)])
+
+    result, queued = asyncio.run(_extract(engine, SOURCE))
+
+    assert result.success
+    assert [p.name for p in result.parameters] == ["misa"]
+    assert queued == result.parameters
+
+
+def test_malformed_proposals_are_dropped(engine):
+    params = [
+        _param("misa", "The misa CSR"),
+        {"name": "no category", "excerpt": "The MXL field"},
+        _param("XLEN", "XLEN is 32", confidence=1.5),
+        "not an object",
+    ]
+    _fake_gemini(engine, _split(json.dumps(params)))
+
+    result, _ = asyncio.run(_extract(engine, SOURCE))
+
+    assert result.success
+    assert [p.name for p in result.parameters] == ["misa"]
+
+
+def test_gemini_error_mid_stream_fails_extraction(engine):
+    parts = _split(json.dumps([_param("misa", "The misa CSR")] * 40))
+    _fake_gemini(engine, parts[:5], error=ConnectionResetError("stream dropped"))
+
+    result, _ = asyncio.run(_extract(engine, SOURCE))
+
+    assert not result.success
+    assert "stream dropped" in result.error
+
+
+def test_gemini_error_mid_stream_fails_pipeline(engine):
+    params = [_param(f"p{i}", "The misa CSR") for i in range(core_logic.VERIFY_BATCH_SIZE)]
+    _fake_gemini(engine, [json.dumps(params)[:-1]], error=ConnectionResetError("stream dropped"))
+    _fake_speculative(engine)
+    engine._groq_completion = FakeGroq()
+
+    result = asyncio.run(engine._run_phases(SOURCE))
+
+    assert result["phase"] == "extraction"
+    assert "stream dropped" in result["error"]
+
+
+# ==============================================================================
+# PHASE 2: SCREENING AND SPECULATIVE AGREEMENT
+# ==============================================================================
+
+def test_ungrounded_excerpts_are_rejected_without_verification(engine):
+    params = [_param("misa", "The misa CSR is a WARL"), _param("mtvec", "mtvec is always zero")]
+    _fake_gemini(engine, [json.dumps(params)])
+    _fake_speculative(engine)
+    groq = FakeGroq()
+    engine._groq_completion = groq
+
+    result = asyncio.run(engine._run_phases(SOURCE))
+
+    assert [item["name"] for item in result["data"]] == ["misa"]
+    assert result["rejected_count"] == 1
+    assert [p["name"] for call in groq.calls for p in call] == ["misa"]
+
+
+def test_speculative_agreement_keeps_gemini_proposal(engine):
+    params = [
+        _param("misa", "The misa CSR is a WARL read-write register"),
+        _param("misa", "reporting the ISA supported by the hart"),
+    ]
+    _fake_gemini(engine, [json.dumps(params)])
+    _fake_speculative(engine, [VerifiedItem(
+        name="misa", excerpt="misa CSR", category="Named",
+        confidence=0.99, verification_notes="speculative",
+    )])
+    groq = FakeGroq()
+    engine._groq_completion = groq
+
+    result = asyncio.run(engine._run_phases(SOURCE))
+
+    by_excerpt = {item["excerpt"]: item for item in result["data"]}
+    assert set(by_excerpt) == {p["excerpt"] for p in params}
+    agreed = by_excerpt[params[0]["excerpt"]]
+    assert agreed["confidence"] == 0.99
+    assert agreed["verification_notes"] == "speculative"
+    # The speculative verdict settles one proposal; the duplicate is verified.
+    assert [p["excerpt"] for call in groq.calls for p in call] == [params[1]["excerpt"]]
+
+
+def test_ungrounded_speculative_verdict_is_not_agreement(engine):
+    params = [_param("misa", "The misa CSR is a WARL read-write register")]
+    _fake_gemini(engine, [json.dumps(params)])
+    _fake_speculative(engine, [VerifiedItem(
+        name="misa", excerpt="misa is read-only zero", category="Named", confidence=0.99,
+    )])
+    groq = FakeGroq()
+    engine._groq_completion = groq
+
+    result = asyncio.run(engine._run_phases(SOURCE))
+
+    assert [item["excerpt"] for item in result["data"]] == [params[0]["excerpt"]]
+    assert result["data"][0]["confidence"] == 0.9
+    assert len(groq.calls) == 1
+
+
+def test_slow_speculative_pass_does_not_block_verification(engine):
+    params = [_param(f"p{i}", "The misa CSR") for i in range(core_logic.VERIFY_BATCH_SIZE + 1)]
+    _fake_gemini(engine, _split(json.dumps(params)))
+    released = asyncio.Event()
+
+    async def never_finishes(text_chunk):
+        await released.wait()
+    engine._propose_with_llama = never_finishes
+    groq = FakeGroq()
+    engine._groq_completion = groq
+
+    result = asyncio.run(asyncio.wait_for(engine._run_phases(SOURCE), timeout=5))
+
+    assert result["validated_count"] == len(params)
+    assert [len(call) for call in groq.calls] == [core_logic.VERIFY_BATCH_SIZE, 1]
+
+
+def test_null_fields_in_verdicts_use_defaults(engine):
+    reply = '{"results": [{"name": null, "excerpt": "x", "is_valid": null, "confidence": null}]}'
+
+    result = engine._parse_llama_response(reply)
+
+    assert result.results[0].name == "Unknown"
+    assert result.results[0].is_valid is True
+    assert result.results[0].confidence == 0.8
+
+
+@pytest.mark.skipif(core_logic.hyperscan is None, reason="hyperscan not installed")
+def test_hyperscan_grounding_matches_substring_search(monkeypatch):
+    excerpts = [
+        "The misa CSR is a WARL",
+        "THE MXL FIELD encodes",
+        "xlen is 32\nfor   RV32",
+        "mtvec is always zero",
+        "",
+        "   ",
+        "(64) [RV64]. *",
+    ]
+    source = SOURCE + " Widths: (64) [RV64]. * end"
+    screen = core_logic._ProposalScreen(source)
+
+    monkeypatch.setattr(core_logic, "HYPERSCAN_MIN_CHARS", float("inf"))
+    expected = screen.grounded(excerpts)
+
+    scans = []
+    original = core_logic._ProposalScreen._grounded_hyperscan
+    monkeypatch.setattr(core_logic, "HYPERSCAN_MIN_CHARS", 0)
+    monkeypatch.setattr(
+        core_logic._ProposalScreen, "_grounded_hyperscan",
+        lambda self, e: scans.append(e) or original(self, e),
+    )
+
+    assert screen.grounded(excerpts) == expected
+    assert expected == [True, True, True, False, False, False, True]
+    assert len(scans) == 1
+
+
+def test_near_duplicate_cache_hit_must_be_grounded(engine):
+    cached = {"data": [{"name": "XLEN", "excerpt": "XLEN is 32"}]}
+
+    assert engine._reusable("XLEN is 32 for RV32.", cached)
+    assert not engine._reusable("XLEN is 64 for RV64.", cached)
+    assert not engine._reusable("XLEN is 64 for RV64.", {"data": []})
+
+
+def test_exact_cache_hit_survives_embedding_failure(engine):
+    class DownEmbedder:
+        async def embed(self, text):
+            raise ConnectionError("embedding service down")
+    engine.cache.embedder = DownEmbedder()
+    _fake_gemini(engine, [json.dumps([_param("misa", "The misa CSR")])])
+    _fake_speculative(engine)
+    groq_fake = FakeGroq()
+    engine._groq_completion = groq_fake
+
+    async def main():
+        first = await engine.run_pipeline(SOURCE)
+        return first, await engine.run_pipeline(SOURCE)
+
+    first, second = asyncio.run(main())
+
+    assert second == first
+    assert len(groq_fake.calls) == 1
+
+
+def test_stringly_typed_verdicts_and_odd_summaries_are_accepted(engine):
+    reply = json.dumps({
+        "results": [{"name": "misa", "is_valid": "false", "confidence": "0.7"}],
+        "summary": "all parameters checked",
+    })
+
+    result = engine._parse_llama_response(reply)
+
+    assert result.results[0].is_valid is False
+    assert result.results[0].confidence == 0.7
+    assert result.summary is None
+
+
+# ==============================================================================
+# VERIFICATION BATCHES
+# ==============================================================================
+
+def _proposals(count):
+    return [Parameter(name=f"p{i}", excerpt="The misa CSR", category="Named") for i in range(count)]
+
+
+def test_verification_is_sharded_into_mini_batches(engine):
+    groq_fake = FakeGroq()
+    engine._groq_completion = groq_fake
+    proposals = _proposals(core_logic.VERIFY_BATCH_SIZE + 4)
+
+    result = asyncio.run(engine._verify_with_llama(SOURCE, proposals))
+
+    assert result.success
+    assert [item.name for item in result.results] == [p.name for p in proposals]
+    assert [len(call) for call in groq_fake.calls] == [core_logic.VERIFY_BATCH_SIZE, 4]
+    assert result.summary["validated"] == len(proposals)
+
+
+def test_truncated_verifier_reply_splits_the_batch(engine):
+    groq_fake = FakeGroq(truncate_above=4)
+    engine._groq_completion = groq_fake
+    proposals = _proposals(10)
+
+    result = asyncio.run(engine._verify_with_llama(SOURCE, proposals))
+
+    assert result.success
+    assert [item.name for item in result.results] == [p.name for p in proposals]
+    assert [len(call) for call in groq_fake.calls] == [10, 5, 5, 2, 3, 2, 3]
+
+
+def test_oversized_batch_is_split_before_sending(engine):
+    groq_fake = FakeGroq()
+    engine._groq_completion = groq_fake
+    long_excerpt = "x" * (core_logic.MAX_VERIFY_TOKENS * core_logic.CHARS_PER_TOKEN // 2)
+    proposals = [Parameter(name=f"p{i}", excerpt=long_excerpt, category="Named") for i in range(2)]
+
+    result = asyncio.run(engine._verify_one_batch(SOURCE, proposals))
+
+    assert result.success
+    assert [len(call) for call in groq_fake.calls] == [1, 1]
+
+
+def test_unsplittable_truncated_reply_fails(engine):
+    engine._groq_completion = FakeGroq(truncate_above=0)
+
+    result = asyncio.run(engine._verify_one_batch(SOURCE, _proposals(1)))
+
+    assert not result.success
+    assert "JSON" in result.error
+
+
+# ==============================================================================
+# RETRIES
+# ==============================================================================
+
+_REQUEST = httpx.Request("POST", "https://api.example.test")
+
+
+@pytest.mark.parametrize("exc, transient", [
+    (genai_errors.APIError(429, {}), True),
+    (genai_errors.APIError(503, {}), True),
+    (genai_errors.APIError(400, {}), False),
+    (groq.RateLimitError("slow down", response=httpx.Response(429, request=_REQUEST), body=None), True),
+    (groq.InternalServerError("oops", response=httpx.Response(500, request=_REQUEST), body=None), True),
+    (groq.BadRequestError("bad", response=httpx.Response(400, request=_REQUEST), body=None), False),
+    (groq.APIConnectionError(request=_REQUEST), True),
+    (httpx.ReadTimeout("timed out", request=_REQUEST), True),
+    (TimeoutError(), True),
+    (ValueError("bad JSON"), False),
+])
+def test_is_transient(exc, transient):
+    assert core_logic._is_transient(exc) is transient
+
+
+# ==============================================================================
+# IN-FLIGHT COALESCING
+# ==============================================================================
+
+def test_concurrent_identical_chunks_share_one_run(engine):
+    runs = []
+
+    async def run_cached(text_chunk):
+        runs.append(text_chunk)
+        await asyncio.sleep(0.01)
+        return {"data": [text_chunk]}
+    engine._run_cached = run_cached
+
+    async def main():
+        return await asyncio.gather(
+            engine.run_pipeline(SOURCE),
+            engine.run_pipeline(SOURCE),
+            engine.run_pipeline("another chunk"),
+        )
+
+    results = asyncio.run(main())
+
+    assert runs == [SOURCE, "another chunk"]
+    assert results[0] is results[1]
+    assert engine._inflight == {}
+
+
+def test_cancelled_caller_does_not_cancel_shared_run(engine):
+    release = None
+
+    async def run_cached(text_chunk):
+        await release.wait()
+        return {"data": []}
+    engine._run_cached = run_cached
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.create_task(engine.run_pipeline(SOURCE))
+        second = asyncio.create_task(engine.run_pipeline(SOURCE))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await second, first.cancelled()
+
+    result, first_cancelled = asyncio.run(main())
+
+    assert result == {"data": []}
+    assert first_cancelled
+
+
+# ==============================================================================
+# BATCH MODE
+# ==============================================================================
+
+def _fake_batches(engine, texts, fail_create=False):
+    job = SimpleNamespace(name="batches/1", state=None, dest=None)
+    inlined = [
+        SimpleNamespace(error=None, response=SimpleNamespace(text=text))
+        for text in texts
+    ]
+
+    async def create(**kwargs):
+        if fail_create:
+            raise genai_errors.APIError(400, {})
+        job.state = SimpleNamespace(name="JOB_STATE_RUNNING")
+        return job
+
+    async def get(name):
+        job.state = SimpleNamespace(name="JOB_STATE_SUCCEEDED")
+        job.dest = SimpleNamespace(inlined_responses=inlined)
+        return job
+
+    engine.gemini = SimpleNamespace(
+        aio=SimpleNamespace(batches=SimpleNamespace(create=create, get=get))
+    )
+
+
+def test_batch_keeps_results_when_one_response_is_empty(engine, monkeypatch):
+    monkeypatch.setattr(core_logic, "BATCH_POLL_SECONDS", 0)
+    _fake_batches(engine, [None, json.dumps([_param("misa", "The misa CSR")])])
+    engine._groq_completion = FakeGroq()
+
+    results = asyncio.run(engine.run_pipeline_batch(["first chunk", SOURCE]))
+
+    assert results[0]["phase"] == "extraction"
+    assert "no text" in results[0]["error"]
+    assert results[1]["validated_count"] == 1
+
+
+def test_batch_falls_back_to_interactive_pipeline(engine):
+    _fake_batches(engine, [], fail_create=True)
+    interactive = []
+
+    async def run_pipeline(text_chunk):
+        interactive.append(text_chunk)
+        return {"data": []}
+    engine.run_pipeline = run_pipeline
+
+    results = asyncio.run(engine.run_pipeline_batch(["a", "b"]))
+
+    assert interactive == ["a", "b"]
+    assert results == [{"data": []}, {"data": []}]
+
+
+# ==============================================================================
+# CHUNKING
+# ==============================================================================
+
+def _baseline_chunk_text(text, max_chunk_size=8000):
+    """chunk_text as originally written, kept as the reference behaviour."""
+    if len(text) <= max_chunk_size:
+        return [text]
+
+    chunks = []
+    paragraphs = text.split("\n\n")
+    current_chunk = ""
+
+    for para in paragraphs:
+        if len(current_chunk) + len(para) + 2 <= max_chunk_size:
+            current_chunk += para + "\n\n"
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = para + "\n\n"
+
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+
+    return chunks
+
+
+def _random_document(rng):
+    paragraphs = []
+    for _ in range(rng.randint(1, 80)):
+        size = rng.choice([0, 1, rng.randint(1, 300), rng.randint(300, 3000)])
+        paragraphs.append("".join(rng.choice("ab \n") for _ in range(size)))
+    return "\n\n".join(paragraphs)
+
+
+def test_chunk_text_matches_baseline():
+    rng = random.Random(0)
+    for _ in range(300):
+        text = _random_document(rng)
+        size = rng.choice([50, 500, 2000, 6000, 8000])
+        assert chunk_text(text, size) == _baseline_chunk_text(text, size)
+
+
+@pytest.mark.skipif(core_logic.njit is None, reason="numba not installed")
+def test_numba_chunking_matches_baseline():
+    rng = random.Random(1)
+    for _ in range(100):
+        text = _random_document(rng)
+        size = rng.choice([50, 500, 2000, 6000])
+        if len(text) <= size:
+            continue
+        assert core_logic._chunk_text_numba(text, size) == _baseline_chunk_text(text, size)
@@ -0,0 +1,122 @@
+# ==============================================================================
+# RISC-V Consensus Engine - API Tests
+# ==============================================================================
+# Endpoint tests with the ConsensusEngine replaced by an in-memory fake.
+# Run from the repository root with: python -m pytest
+# ==============================================================================
+
+import asyncio
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from api import index
+from api.index import FastJSONResponse, app
+
+TEXT = "The misa CSR is a WARL read-write register reporting the ISA supported by the hart."
+
+
+class FakeEngine:
+    """Stands in for ConsensusEngine; tracks how many chunks run at once."""
+
+    def __init__(self):
+        self.chunks = []
+        self.active = 0
+        self.peak = 0
+
+    async def run_pipeline(self, text_chunk):
+        self.chunks.append(text_chunk)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return {
+            "original_count": 1,
+            "validated_count": 1,
+            "rejected_count": 0,
+            "data": [{"name": "misa", "excerpt": text_chunk[:20]}],
+        }
+
+    async def run_pipeline_batch(self, chunks):
+        return [await self.run_pipeline(chunk) for chunk in chunks]
+
+    async def aclose(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("GEMINI_KEY", "test")
+    monkeypatch.setenv("GROQ_KEY", "test")
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def fake_engine(client):
+    """Swap the engine created at startup for a FakeEngine."""
+    engine, app.state.engine = app.state.engine, FakeEngine()
+    yield app.state.engine
+    app.state.engine = engine
+
+
+def test_missing_keys_return_503(monkeypatch):
+    monkeypatch.delenv("GEMINI_KEY", raising=False)
+    monkeypatch.delenv("GROQ_KEY", raising=False)
+
+    with TestClient(app) as client:
+        assert client.get("/api/health").json()["status"] == "degraded"
+        response = client.post("/api/extract", json={"text": TEXT})
+
+    assert response.status_code == 503
+    assert "GEMINI_KEY" in response.json()["detail"]
+
+
+def test_engine_is_created_once_at_startup(client):
+    engine = app.state.engine
+
+    client.get("/api/health")
+
+    assert engine is not None
+    assert app.state.engine is engine
+
+
+def test_extract_returns_pipeline_result_as_json(client, fake_engine):
+    response = client.post("/api/extract", json={"text": TEXT})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["data"] == [{"name": "misa", "excerpt": TEXT[:20]}]
+
+
+def test_fast_json_response_renders_with_orjson():
+    content = {"name": "XLEN", "confidence": 0.95, "data": [1, None, True]}
+
+    assert FastJSONResponse(content).body == orjson.dumps(content)
+
+
+def test_extract_chunked_bounds_concurrency(client, fake_engine):
+    paragraphs = [f"Paragraph {i}: " + "x" * 2000 for i in range(10)]
+
+    response = client.post(
+        "/api/extract-chunked",
+        json={"text": "\n\n".join(paragraphs), "max_concurrency": 2},
+    )
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["chunks_processed"] == len(fake_engine.chunks) > 2
+    assert body["validated_count"] == len(fake_engine.chunks)
+    assert fake_engine.peak == 2
+
+
+def test_batch_job_is_polled_until_complete(client, fake_engine):
+    job = client.post("/api/extract-batch", json={"text": TEXT}).json()
+    poll = client.get(job["poll"]).json()
+    while poll["status"] == "running":
+        poll = client.get(job["poll"]).json()
+
+    assert poll["validated_count"] == 1
+    assert client.get(job["poll"]).status_code == 404
+    assert index._batch_jobs == {}